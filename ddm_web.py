@@ -1,11 +1,314 @@
+import math
+import threading
+from typing import NamedTuple
+
 import streamlit as st
 import numpy as np
-import matplotlib.pyplot as plt
-import time
+import pandas as pd
+import altair as alt
+from matplotlib.figure import Figure
+from numba import config, njit, prange
+
+FRAME_INTERVAL = 0.05  # Seconds between live plot updates
+PLAYBACK_SPEED = 5.0  # Simulated seconds shown per second of wall-clock time
+MAX_TIME = 5.0  # Length of a single trial (seconds)
+DTYPE = np.float32  # Trajectories and noise; single precision is plenty for display
+ENSEMBLE_BINS = np.linspace(0, MAX_TIME, 51)  # Decision time histogram bins
+FPT_GRID = 5001  # Time points for the analytic first-passage CDF, log-spaced from FPT_T_MIN
+FPT_T_MIN = 1e-10  # Earliest grid time, in units of the squared boundary separation
+
+# Streamlit runs the script in a worker thread. Launching a TBB-backed parallel
+# kernel from such a thread leaves the process unable to exit, so prefer OpenMP
+# and fall back to workqueue. TBB is kept only as a last resort.
+config.THREADING_LAYER_PRIORITY = ['omp', 'workqueue', 'tbb']
+
+@st.cache_resource
+def _ensemble_lock():
+    """Process-wide lock so sessions take turns running the ensemble kernel.
+
+    The workqueue layer aborts on concurrent parallel launches. Streamlit executes
+    the script in a fresh module on every rerun, so a module-level lock would not
+    be shared; the resource cache hands every run the same one.
+    """
+    return threading.Lock()
+
+@njit(cache=True, fastmath=True)
+def _bridge_hit(prev, evidence, thr, two_over_var, u):
+    """Boundary code (1, -1 or 0) for a crossing hidden between two samples inside the thresholds.
+
+    The Brownian bridge between the samples touches a boundary at distances d0
+    and d1 from them with probability exp(-2 d0 d1 / (σ² dt)); the uniform draw
+    u decides whether, and at which boundary, that happened.
+    """
+    p_upper = math.exp(-two_over_var * (thr - prev) * (thr - evidence))
+    if u < p_upper:
+        return 1
+    if u < p_upper + math.exp(-two_over_var * (thr + prev) * (thr + evidence)):
+        return -1
+    return 0
+
+@njit(cache=True, fastmath=True)
+def _sim(step, scale, thr, start, z, u, out):
+    """Integrate evidence from start in one fused pass over the standard normals z.
+
+    step is the drift per time step (v * dt) and scale the noise per time step
+    (σ * sqrt(dt)). Crossings between time steps are caught with a Brownian
+    bridge test on the uniforms u, so a coarse dt does not miss decisions. Each
+    step is written into out (a hidden crossing is drawn at the boundary).
+    Returns (index, evidence): the index of the first boundary crossing, or -1
+    if the evidence stayed within the thresholds, and the final evidence in
+    double precision. Evidence is accumulated in double precision even when z
+    and out are float32; pass the returned evidence back in as start to
+    continue a trial without rounding it to out's precision.
+    """
+    two_over_var = 2 / (scale * scale)
+    prev = np.float64(start)
+    for i in range(z.shape[0]):
+        evidence = prev + step + scale * z[i]
+        out[i] = evidence
+        if abs(evidence) >= thr:
+            return i, evidence
+        hit = _bridge_hit(prev, evidence, thr, two_over_var, u[i])
+        if hit != 0:
+            out[i] = hit * thr
+            return i, hit * thr
+        prev = evidence
+    return -1, prev
+
+@njit(parallel=True, cache=True, fastmath=True)
+def _run_many(step, scale, thr, bias, z, u, antithetic, first_hit, boundary):
+    """Simulate one trial per entry of first_hit in parallel, filling first_hit and boundary.
+
+    Trial p reads row p of z and u, or with antithetic row p // 2, with the
+    noise negated for odd p so that each pair of trials shares its draws.
+    """
+    two_over_var = 2 / (scale * scale)
+    per_row = 2 if antithetic else 1
+    for p in prange(first_hit.shape[0]):
+        first_hit[p] = -1
+        boundary[p] = 0
+        row, sign = p // per_row, 1 - 2 * (p % per_row)
+        prev = np.float64(bias)
+        for i in range(z.shape[1]):
+            evidence = prev + step + sign * scale * z[row, i]
+            if abs(evidence) >= thr:
+                first_hit[p] = i + 1
+                boundary[p] = 1 if evidence > 0 else -1
+                break
+            hit = _bridge_hit(prev, evidence, thr, two_over_var, u[row, i])
+            if hit != 0:
+                first_hit[p] = i + 1
+                boundary[p] = hit
+                break
+            prev = evidence
+
+@st.cache_data(max_entries=256)
+def _simulate_trial(drift, sigma, dt, thr, bias, max_t, seed):
+    """Simulate a complete trial, returning (time, evidence, boundary code).
+
+    Memoized on the parameters and seed, so replaying a recent trial only
+    unpickles a copy of the stored result instead of re-simulating it.
+    """
+    n_steps = int(round(max_t / dt)) + 1
+    evidence = np.empty(n_steps, dtype=DTYPE)
+    evidence[0] = bias
+    rng = np.random.default_rng(seed)
+    z = rng.standard_normal(n_steps - 1, dtype=DTYPE)
+    u = rng.random(n_steps - 1, dtype=DTYPE)
+    hit, _ = _sim(drift * dt, sigma * math.sqrt(dt), thr, bias, z, u, evidence[1:])
+    if hit < 0:
+        return dt * np.arange(n_steps), evidence, 0
+    end = hit + 2
+    return dt * np.arange(end), evidence[:end], 1 if evidence[end - 1] > 0 else -1
+
+def _fpt_density(t, drift, a, w):
+    """First-passage density through the lower boundary of a unit-noise diffusion.
+
+    The process starts at w * a between absorbing boundaries at 0 and a. Uses the
+    small-time series for t < a² and the large-time series otherwise (Navarro &
+    Fuss, 2009), combining exponents before exp() so strong drifts cannot overflow.
+    """
+    density = np.zeros_like(t)
+    u = t / a**2  # Normalized time
+    small = (u > 0) & (u < 1)
+    large = u >= 1
+    
+    x = w + 2 * np.arange(-5, 6)[:, None]
+    ts, us = t[small], u[small]
+    density[small] = ((x * np.exp(-drift * a * w - drift**2 * ts / 2 - x**2 / (2 * us))).sum(axis=0)
+                      / (a**2 * np.sqrt(2 * np.pi * us**3)))
+    
+    k = np.arange(1, 11)[:, None]
+    tl, ul = t[large], u[large]
+    density[large] = np.pi / a**2 * (k * np.sin(k * np.pi * w)
+                                     * np.exp(-drift * a * w - drift**2 * tl / 2 - k**2 * np.pi**2 * ul / 2)).sum(axis=0)
+    return np.maximum(density, 0)
+
+def _absorption(drift, a, w):
+    """Probability that a unit-noise diffusion started at w * a is eventually absorbed at 0 rather than a."""
+    if drift == 0:
+        return 1 - w
+    if drift < 0:
+        return 1 - _absorption(-drift, a, 1 - w)
+    # Written with expm1 so that strong drifts and wide boundaries cannot overflow
+    return math.exp(-2 * drift * a * w) * math.expm1(-2 * drift * a * (1 - w)) / math.expm1(-2 * drift * a)
+
+@st.cache_data(max_entries=32)
+def _fpt_cdf(drift, sigma, thr, bias, max_t):
+    """Cumulative first-passage probabilities of each boundary up to max_t.
+
+    Returns (t, lower, upper) where lower[i] and upper[i] are the probabilities
+    of having decided at that boundary by time t[i]. The densities are integrated
+    on a log-spaced grid: a start close to a boundary puts nearly all the mass in
+    the first microseconds, which a uniform grid would miss.
+    """
+    # Rescale E to a unit-noise process between absorbing boundaries 0 and a
+    a = 2 * thr / sigma
+    w = (bias + thr) / (2 * thr)
+    v = drift / sigma
+    
+    t = np.concatenate(([0.0], a**2 * np.geomspace(FPT_T_MIN, max_t / a**2, FPT_GRID - 1)))
+    half_step = np.diff(t) / 2
+    cdfs = []
+    for density, absorbed in ((_fpt_density(t, v, a, w), _absorption(v, a, w)),
+                              (_fpt_density(t, -v, a, 1 - w), _absorption(-v, a, 1 - w))):
+        cdf = np.concatenate(([0.0], np.cumsum((density[1:] + density[:-1]) * half_step)))
+        # The eventual absorption probability bounds the CDF against quadrature error
+        cdfs.append(np.minimum(cdf, absorbed))
+    return t, cdfs[0], cdfs[1]
+
+@st.cache_resource(max_entries=64)
+def _make_chart(thr, bias):
+    """Build the trial chart once per (threshold, bias); callers only attach the evidence data.
+
+    The chart is shared by all sessions, so it must never be mutated:
+    properties() returns a copy, leaving the cached layers untouched.
+    """
+    series = alt.Color('Series:N', title=None,
+                       scale=alt.Scale(domain=['Evidence', 'Upper Threshold', 'Lower Threshold', 'Starting Point'],
+                                       range=['black', 'red', 'blue', 'green']))
+    time = alt.X('Time:Q', title='Time (seconds)', scale=alt.Scale(domain=[0, MAX_TIME]))  # Fixed time window
+    evidence = alt.Y('Evidence:Q', title='Evidence', scale=alt.Scale(domain=[-thr*1.5, thr*1.5]))
+    
+    line = alt.Chart().mark_line(strokeWidth=2, clip=True).encode(x=time, y=evidence, color=series)
+    thresholds = alt.Chart(pd.DataFrame({
+        'Evidence': [thr, -thr], 'Series': ['Upper Threshold', 'Lower Threshold']
+    })).mark_rule().encode(y=evidence, color=series)
+    start = alt.Chart(pd.DataFrame({
+        'Time': [0.0], 'Evidence': [bias], 'Series': ['Starting Point']
+    })).mark_point(filled=True, size=150, opacity=1).encode(x=time, y=evidence, color=series)
+    
+    return alt.layer(line, thresholds, start).properties(title='Drift Diffusion Model Simulation', height=450)
+
+def _make_ensemble_fig():
+    """Build the decision time histogram with empty bars; plot_ensemble sets their heights.
+
+    The Figure is created directly rather than through pyplot, which would keep
+    every session's figure open in its global figure manager.
+    """
+    fig = Figure(figsize=(10, 4))
+    ax = fig.subplots()
+    
+    zeros = np.zeros(len(ENSEMBLE_BINS) - 1)
+    upper_bars = ax.bar(ENSEMBLE_BINS[:-1], zeros, width=np.diff(ENSEMBLE_BINS), align='edge', color='r',
+                        label='Upper')
+    lower_bars = ax.bar(ENSEMBLE_BINS[:-1], zeros, width=np.diff(ENSEMBLE_BINS), align='edge', color='b',
+                        label='Lower')
+    ax.axhline(y=0, color='k', linewidth=1)
+    
+    ax.set_xlim(0, MAX_TIME)
+    ax.set_xlabel('Decision Time (seconds)')
+    ax.set_ylabel('Number of Trials')
+    ax.legend()
+    ax.grid(True)
+    
+    return fig, ax, upper_bars, lower_bars
+
+class Params(NamedTuple):
+    """Model parameters read from the sliders once per rerun; kernels receive them as plain floats."""
+    drift_rate: float
+    threshold: float
+    bias: float
+    noise_sd: float
+    dt: float
+
+def _read_params():
+    return Params(
+        drift_rate=st.slider('Drift Rate (v)', -3.0, 3.0, 1.5, 
+                             help="Average rate of evidence accumulation (higher = faster decisions)"),
+        threshold=st.slider('Threshold (a)', 0.5, 5.0, 2.0,
+                            help="Decision boundary (higher = more accurate but slower)"),
+        bias=st.slider('Starting Bias (z)', -2.0, 2.0, 0.0,
+                       help="Starting point of evidence (positive = bias toward upper boundary)"),
+        noise_sd=st.slider('Noise (σ)', 0.1, 3.0, 1.0,
+                           help="Standard deviation of noise in evidence accumulation"),
+        dt=0.05
+    )
+
+@st.cache_data
+def _render_equations():
+    st.subheader("Model Equations")
+    st.markdown("""
+    **Evidence Accumulation:**
+    
+    $dE = v \cdot dt + σ \sqrt{dt} \cdot N(0,1)$
+    
+    where:
+    - $E$ = Evidence
+    - $v$ = Drift rate
+    - $σ$ = Noise level
+    - $dt$ = Time step
+    - $N(0,1)$ = Standard normal noise
+    
+    **Decision Rule:**
+    
+    $|E| ≥ a$ = Decision made
+    
+    where:
+    - $a$ = Threshold
+    
+    **Initial Condition:**
+    
+    $E(0) = z$
+    
+    where:
+    - $z$ = Starting bias
+    """)
+
+@st.cache_data
+def _render_description():
+    st.subheader("Model Description")
+    st.markdown("""
+    This simulator shows how decisions might be made in the brain using a 
+    Drift Diffusion Model (DDM).
+    
+    **Parameters:**
+    - **Drift Rate (v)**: Average speed of evidence accumulation
+        - Positive = bias toward upper boundary
+        - Negative = bias toward lower boundary
+    
+    - **Threshold (a)**: How much evidence needed for decision
+        - Higher = more accurate but slower
+        - Lower = faster but more error-prone
+    
+    - **Starting Bias (z)**: Initial evidence level
+        - Positive = head start toward upper boundary
+        - Negative = head start toward lower boundary
+    
+    - **Noise (σ)**: Random fluctuations in evidence
+        - Higher = more random decisions
+        - Lower = more deterministic
+    """)
 
 class DDMSimulator:
     def __init__(self):
         self.setup_params()
+        self.init_state()
+
+    @property
+    def _rng(self):
+        """PCG64 generator held in session state so its stream continues across reruns."""
+        return st.session_state.rng
         
     def setup_params(self):
         st.title("Drift Diffusion Model Simulator")
@@ -15,116 +318,148 @@ class DDMSimulator:
         
         with col1:
             st.subheader("Model Parameters")
-            self.params = {
-                'drift_rate': st.slider('Drift Rate (v)', -3.0, 3.0, 1.5, 
-                                      help="Average rate of evidence accumulation (higher = faster decisions)"),
-                'threshold': st.slider('Threshold (a)', 0.5, 5.0, 2.0,
-                                     help="Decision boundary (higher = more accurate but slower)"),
-                'bias': st.slider('Starting Bias (z)', -2.0, 2.0, 0.0,
-                                help="Starting point of evidence (positive = bias toward upper boundary)"),
-                'noise_sd': st.slider('Noise (σ)', 0.1, 3.0, 1.0,
-                                    help="Standard deviation of noise in evidence accumulation"),
-                'dt': 0.05
-            }
+            self.params = _read_params()
+            self.seed = st.slider('Random Seed', 0, 100, 0,
+                                  help="Seed for the noise generator (applied on Reset)")
+            self.n_steps = int(round(MAX_TIME / self.params.dt)) + 1
+            # Per-step drift and noise scale are fixed for the whole rerun
+            self._drift_step = self.params.drift_rate * self.params.dt
+            self._noise_scale = self.params.noise_sd * math.sqrt(self.params.dt)
+            self.steps_per_frame = max(1, int(round(PLAYBACK_SPEED * FRAME_INTERVAL / self.params.dt)))
             
         with col2:
-            st.subheader("Model Equations")
-            st.markdown("""
-            **Evidence Accumulation:**
-            
-            $dE = v \cdot dt + σ \sqrt{dt} \cdot N(0,1)$
-            
-            where:
-            - $E$ = Evidence
-            - $v$ = Drift rate
-            - $σ$ = Noise level
-            - $dt$ = Time step
-            - $N(0,1)$ = Standard normal noise
-            
-            **Decision Rule:**
-            
-            $|E| ≥ a$ = Decision made
-            
-            where:
-            - $a$ = Threshold
-            
-            **Initial Condition:**
-            
-            $E(0) = z$
-            
-            where:
-            - $z$ = Starting bias
-            """)
+            _render_equations()
 
-        # Initialize state if not exists
-        if 'time' not in st.session_state:
-            st.session_state.time = 0
-            st.session_state.evidence = self.params['bias']
-            st.session_state.evidence_history = [self.params['bias']]
-            st.session_state.time_history = [0]
-            st.session_state.decision_made = False
-            st.session_state.running = False
-            
         with col3:
-            st.subheader("Model Description")
-            st.markdown("""
-            This simulator shows how decisions might be made in the brain using a 
-            Drift Diffusion Model (DDM).
-            
-            **Parameters:**
-            - **Drift Rate (v)**: Average speed of evidence accumulation
-                - Positive = bias toward upper boundary
-                - Negative = bias toward lower boundary
-            
-            - **Threshold (a)**: How much evidence needed for decision
-                - Higher = more accurate but slower
-                - Lower = faster but more error-prone
-            
-            - **Starting Bias (z)**: Initial evidence level
-                - Positive = head start toward upper boundary
-                - Negative = head start toward lower boundary
-            
-            - **Noise (σ)**: Random fluctuations in evidence
-                - Higher = more random decisions
-                - Lower = more deterministic
-            """)
+            _render_description()
+
+    def init_state(self):
+        # Initialize state if not exists
+        if 'evidence_buf' not in st.session_state:
+            self.reset_trial()
+            st.session_state.full_trials = 0
+
+    def reset_trial(self, reseed=True):
+        """Clear the current trial, preallocating the evidence buffer.
+
+        With reseed, the generator restarts from the seed so the same trials replay.
+        """
+        if reseed:
+            st.session_state.rng = np.random.default_rng(self.seed)
+        st.session_state.evidence_buf = np.empty(self.n_steps, dtype=DTYPE)
+        st.session_state.evidence_buf[0] = self.params.bias
+        st.session_state.evidence = float(self.params.bias)  # Running evidence in double precision
+        st.session_state.n = 1
+        st.session_state.boundary = 0
+        st.session_state.decision_made = False
+        st.session_state.running = False
 
     def update_simulation(self):
         if not st.session_state.decision_made and st.session_state.running:
-            # Update evidence multiple steps at once for speed
-            for _ in range(5):  # Process 5 steps at once
-                noise = self.params['noise_sd'] * np.sqrt(self.params['dt']) * np.random.normal()
-                new_evidence = st.session_state.evidence + (self.params['drift_rate'] * self.params['dt'] + noise)
-                
-                # Update histories
-                st.session_state.time += self.params['dt']
-                st.session_state.evidence = new_evidence
-                st.session_state.evidence_history.append(new_evidence)
-                st.session_state.time_history.append(st.session_state.time)
-                
-                # Check for decision
-                if abs(new_evidence) >= self.params['threshold']:
-                    st.session_state.decision_made = True
-                    decision_boundary = "Upper" if new_evidence >= self.params['threshold'] else "Lower"
-                    st.success(f"Decision made: {decision_boundary} boundary crossed at {st.session_state.time:.2f} seconds")
-                    break
+            buf, n = st.session_state.evidence_buf, st.session_state.n
+            
+            # Simulate everything up to the next frame in one batch, writing straight into the buffer
+            steps = min(self.steps_per_frame, len(buf) - n)
+            # Continue from the float64 evidence, not the float32 copy in the buffer
+            hit, st.session_state.evidence = _sim(
+                self._drift_step, self._noise_scale, self.params.threshold, st.session_state.evidence,
+                self._rng.standard_normal(steps, dtype=DTYPE), self._rng.random(steps, dtype=DTYPE),
+                buf[n:n + steps])
+            st.session_state.n = n = n + (hit + 1 if hit >= 0 else steps)
+            
+            # Check for decision
+            if hit >= 0:
+                st.session_state.decision_made = True
+                st.session_state.boundary = 1 if buf[n - 1] > 0 else -1
+            elif n == len(buf):
+                st.session_state.decision_made = True
+
+    def show_outcome(self):
+        if st.session_state.decision_made:
+            decision_time = (st.session_state.n - 1) * self.params.dt
+            if st.session_state.boundary != 0:
+                decision_boundary = "Upper" if st.session_state.boundary > 0 else "Lower"
+                st.success(f"Decision made: {decision_boundary} boundary crossed at {decision_time:.2f} seconds")
+            else:
+                st.warning(f"No decision made within {MAX_TIME:.0f} seconds")
+
+    def run_single_trial(self, seed):
+        """Simulate a complete trial at once, returning (time, evidence, boundary code)."""
+        return _simulate_trial(self.params.drift_rate, self.params.noise_sd, self.params.dt,
+                               self.params.threshold, self.params.bias, MAX_TIME, seed)
+
+    def run_trials(self, n_paths, antithetic=True):
+        """Simulate n_paths trials in parallel, returning (first_hit, boundary).
+
+        first_hit holds the step index of each trial's decision (-1 if none) and
+        boundary the boundary code (1 upper, -1 lower, 0 no decision). With
+        antithetic, trials come in pairs driven by mirrored noise (z and -z) and
+        the same bridge uniforms, which halves the random draws and reduces the
+        variance of ensemble means.
+        """
+        first_hit = np.empty(n_paths, dtype=np.int64)
+        boundary = np.empty(n_paths, dtype=np.int64)
+        n_rows = (n_paths + 1) // 2 if antithetic else n_paths
+        z = self._rng.standard_normal((n_rows, self.n_steps - 1), dtype=DTYPE)
+        u = self._rng.random((n_rows, self.n_steps - 1), dtype=DTYPE)
+        with _ensemble_lock():
+            _run_many(self._drift_step, self._noise_scale, self.params.threshold,
+                      self.params.bias, z, u, antithetic, first_hit, boundary)
+        return first_hit, boundary
+
+    def run_trials_analytic(self, n_paths):
+        """Sample n_paths decisions from the first-passage distribution, returning (decision_time, boundary).
+
+        Each (time, boundary) pair is drawn by inverting the first-passage CDF
+        instead of integrating a trajectory. Trials without a decision by MAX_TIME
+        get boundary 0 and a NaN decision time.
+        """
+        if abs(self.params.bias) >= self.params.threshold:
+            # Starting on or beyond a boundary decides immediately
+            return np.zeros(n_paths), np.full(n_paths, 1 if self.params.bias > 0 else -1)
+        
+        t, lower, upper = _fpt_cdf(self.params.drift_rate, self.params.noise_sd, self.params.threshold,
+                                   self.params.bias, MAX_TIME)
+        u = self._rng.random(n_paths)
+        is_lower = u < lower[-1]
+        is_upper = ~is_lower & (u < lower[-1] + upper[-1])
+        
+        decision_time = np.full(n_paths, np.nan)
+        decision_time[is_lower] = np.interp(u[is_lower], lower, t)
+        decision_time[is_upper] = np.interp(u[is_upper] - lower[-1], upper, t)
+        return decision_time, is_upper.astype(np.int64) - is_lower
 
     def plot_trial(self):
-        fig, ax = plt.subplots(figsize=(10, 6))
+        chart = _make_chart(self.params.threshold, self.params.bias)
         
-        # Plot current trajectory
-        ax.plot(st.session_state.time_history, st.session_state.evidence_history, 'k-', label='Evidence', linewidth=2)
-        ax.axhline(y=self.params['threshold'], color='r', linestyle='-', label='Upper Threshold')
-        ax.axhline(y=-self.params['threshold'], color='b', linestyle='-', label='Lower Threshold')
-        ax.plot(0, self.params['bias'], 'go', markersize=10, label='Starting Point')
+        # Plot current trajectory straight from the evidence buffer
+        n = st.session_state.n
+        return chart.properties(data=pd.DataFrame({
+            'Time': self.params.dt * np.arange(n),
+            'Evidence': st.session_state.evidence_buf[:n],
+            'Series': 'Evidence'
+        }))
+
+    def plot_ensemble(self, decision_time, boundary):
+        # The figure and its bars persist for the session; only bar heights and labels change
+        if 'ensemble_fig' not in st.session_state:
+            st.session_state.ensemble_fig = _make_ensemble_fig()
+        fig, ax, upper_bars, lower_bars = st.session_state.ensemble_fig
         
-        ax.set_xlim(0, 5)  # Fixed time window
-        ax.set_ylim(-self.params['threshold']*1.5, self.params['threshold']*1.5)
-        ax.set_xlabel('Time (seconds)')
-        ax.set_ylabel('Evidence')
-        ax.set_title('Drift Diffusion Model Simulation')
-        ax.legend()
-        ax.grid(True)
+        # Upper boundary decisions above the axis, lower boundary decisions below
+        upper, _ = np.histogram(decision_time[boundary > 0], ENSEMBLE_BINS)
+        lower, _ = np.histogram(decision_time[boundary < 0], ENSEMBLE_BINS)
+        for bar, count in zip(upper_bars, upper):
+            bar.set_height(count)
+        for bar, count in zip(lower_bars, lower):
+            bar.set_height(-count)
+        ax.relim()
+        ax.autoscale_view(scalex=False)
+        
+        upper_label, lower_label = ax.get_legend().get_texts()
+        upper_label.set_text(f'Upper ({np.mean(boundary > 0):.0%})')
+        lower_label.set_text(f'Lower ({np.mean(boundary < 0):.0%})')
+        ax.set_title(f'Decision Time Distribution ({len(boundary)} trials, {np.mean(boundary == 0):.0%} undecided)')
         
         return fig
 
@@ -140,28 +475,46 @@ def main():
             st.session_state.running = not st.session_state.running
     with col2:
         if st.button('Reset'):
-            st.session_state.time = 0
-            st.session_state.evidence = simulator.params['bias']
-            st.session_state.evidence_history = [simulator.params['bias']]
-            st.session_state.time_history = [0]
-            st.session_state.decision_made = False
-            st.session_state.running = False
+            simulator.reset_trial()
+            st.session_state.full_trials = 0
+    with col3:
+        if st.button('Run Full Trial'):
+            # Each full trial gets its own seed; after Reset the same sequence replays
+            st.session_state.full_trials += 1
+            simulator.reset_trial(reseed=False)
+            _, evidence, boundary = simulator.run_single_trial((simulator.seed, st.session_state.full_trials))
+            st.session_state.evidence_buf[:len(evidence)] = evidence
+            st.session_state.evidence = float(evidence[-1])
+            st.session_state.n = len(evidence)
+            st.session_state.boundary = boundary
+            st.session_state.decision_made = True
     
-    # Create placeholder for plot
-    plot_placeholder = st.empty()
-    
-    # Main simulation loop
-    while True:
+    # Live trial: while running, only this fragment reruns on each tick
+    @st.fragment(run_every=FRAME_INTERVAL if st.session_state.running else None)
+    def live_trial():
         simulator.update_simulation()
-        plot_placeholder.pyplot(simulator.plot_trial())
-        time.sleep(0.001)  # Reduced sleep time for faster updates
-        
-        if not st.session_state.running:
-            break
+        st.altair_chart(simulator.plot_trial())
+        simulator.show_outcome()
         
-        if st.session_state.decision_made:
+        if st.session_state.running and st.session_state.decision_made:
             st.session_state.running = False
-            break
+            st.rerun()
+    
+    live_trial()
+    
+    # Ensemble of trials for decision time statistics
+    st.subheader("Trial Ensemble")
+    n_trials = st.slider('Number of Trials', 100, 5000, 1000, step=100)
+    method = st.radio('Method', ['Analytic first passage', 'Euler simulation'], horizontal=True,
+                      help="Analytic sampling draws decision times directly; Euler integrates every trajectory")
+    if st.button('Simulate Ensemble'):
+        if method == 'Analytic first passage':
+            st.session_state.ensemble = simulator.run_trials_analytic(n_trials)
+        else:
+            first_hit, boundary = simulator.run_trials(n_trials)
+            st.session_state.ensemble = (np.where(boundary != 0, first_hit * simulator.params.dt, np.nan), boundary)
+    if 'ensemble' in st.session_state:
+        st.pyplot(simulator.plot_ensemble(*st.session_state.ensemble))
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file